@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Modelos de datos de la historia clínica cardiológica (v3).
+
+Módulo sin dependencias de Streamlit: contiene los modelos Pydantic y los
+helpers de formateo/exportación usados por la app y por los tests.
+"""
+
+from __future__ import annotations
+from typing import List, Literal, Optional
+
+import pandas as pd
+from pydantic import BaseModel, Field, TypeAdapter, computed_field
+
+# ---------------- Modelos de datos ----------------
+# Opciones cerradas como Literal: pydantic-core las valida por pertenencia
+# en lugar de compilar y evaluar una expresión regular por campo.
+SiNo = Literal["Si", "No"]
+Sexo = Literal["M", "F"]
+Tabaquismo = Literal["Si", "No", "Ex tabaquista", "Extabaquista"]
+Unidad = Literal["mg", "gr", "ng", "mcg"]
+
+class Paciente(BaseModel):
+    # numeric ranges are enforced via Field (no conint/confloat call expressions
+    # in type position); closed choices use the Literal aliases above
+    edad: int = Field(..., ge=1, le=110)
+    sexo: Sexo
+    tabaquismo: Tabaquismo
+    diabetes: SiNo
+    dislipemia: SiNo
+    hta: SiNo
+    antecedentes_familiares: SiNo
+    peso_kg: float = Field(..., ge=1, le=500)
+    altura_m: float = Field(..., ge=0.4, le=2.5)
+    alergias: SiNo
+    ant_neurologicos: str = Field(default="")
+    ant_cardiovasculares: str = Field(default="")
+    ant_respiratorios: str = Field(default="")
+    ant_gastrointestinales: str = Field(default="")
+    ant_nefrourologicos: str = Field(default="")
+    ant_traumatologicos: str = Field(default="")
+    ant_otros: str = Field(default="")
+    ant_gineco_obstetricos: str = Field(default="")
+
+    @computed_field
+    @property
+    def imc(self) -> Optional[float]:
+        """Índice de masa corporal (kg/m²) redondeado a 2 decimales."""
+        if not self.altura_m:
+            return None
+        return round(self.peso_kg / self.altura_m ** 2, 2)
+
+class Medicacion(BaseModel):
+    nombre: str
+    dosis: float = Field(..., gt=0)
+    unidad: Unidad
+    frecuencia: str
+
+class ExamenFisico(BaseModel):
+    neurologico: str = Field(default="")
+    cardiovascular: str = Field(default="")
+    respiratorio: str = Field(default="")
+    gastrointestinal: str = Field(default="")
+    genitourinario: str = Field(default="")
+    piel_partes_blandas: str = Field(default="")
+    tas: int = Field(..., ge=1, le=300)
+    tad: int = Field(..., ge=1, le=200)
+
+class ExamenComplementario(BaseModel):
+    fecha: str  # ISO (YYYY-MM-DD)
+    descripcion: str
+
+class EvaluacionIndicaciones(BaseModel):
+    texto: str = ""
+    estado_clinico: str = Field(default="")
+
+class HistoriaClinica(BaseModel):
+    paciente: Paciente
+    medicacion: List[Medicacion]
+    examen_fisico: ExamenFisico
+    examenes_complementarios: List[ExamenComplementario]
+    evaluacion_indicaciones: EvaluacionIndicaciones
+
+
+# Validan una lista completa de filas en una sola llamada a pydantic-core
+MED_LIST_ADAPTER = TypeAdapter(List[Medicacion])
+EXAM_LIST_ADAPTER = TypeAdapter(List[ExamenComplementario])
+
+
+def build_medicacion(df: pd.DataFrame) -> List[Medicacion]:
+    """Valida la tabla de medicación y retorna una Medicacion por fila con nombre.
+
+    Las celdas vacías de texto quedan como "" y la dosis vacía como 0.0, que
+    el modelo rechaza (dosis > 0). Lanza ValidationError si alguna fila es inválida.
+    """
+    df = df.fillna({"nombre": "", "dosis": 0.0, "frecuencia": ""})
+    return MED_LIST_ADAPTER.validate_python([
+        {"nombre": n, "dosis": d, "unidad": u, "frecuencia": f}
+        for n, d, u, f in zip(df["nombre"], df["dosis"], df["unidad"], df["frecuencia"])
+        if n
+    ])
+
+
+def normalize_exams(df: pd.DataFrame) -> List[dict]:
+    """Convierte la tabla de exámenes en filas para ExamenComplementario.
+
+    La fecha se normaliza a ISO (YYYY-MM-DD); fechas vacías o no
+    interpretables quedan como "". Se descartan las filas sin fecha ni
+    descripción.
+    """
+    fechas = pd.to_datetime(df["fecha"], errors="coerce").dt.strftime("%Y-%m-%d").fillna("")
+    descs = df["descripcion"].fillna("")
+    mask = (descs.str.len() > 0) | (fechas.str.len() > 0)
+    return [{"fecha": f, "descripcion": d} for f, d in zip(fechas[mask], descs[mask])]
+
+
+def historia_as_json(hc: HistoriaClinica) -> str:
+    """Return the HistoriaClinica as an indented JSON string.
+
+    Serialized directly by pydantic-core with model_dump_json(); the IMC is
+    included through the Paciente.imc computed field and non-ASCII
+    characters are emitted as-is (not escaped).
+    """
+    return hc.model_dump_json(indent=2)
+
+
+# Antecedentes por sistemas: (sufijo del campo `ant_<sufijo>` de Paciente,
+# nombre en minúscula). El orden es el de presentación en el informe.
+ANT_FIELDS = (
+    ("neurologicos", "neurológicos"),
+    ("cardiovasculares", "cardiovasculares"),
+    ("respiratorios", "respiratorios"),
+    ("gastrointestinales", "gastrointestinales"),
+    ("nefrourologicos", "nefro-urológicos"),
+    ("traumatologicos", "traumatológicos"),
+    ("gineco_obstetricos", "gineco-obstétricos"),
+    ("otros", "otros"),
+)
+
+
+# Plantilla markdown del resumen del paciente (se arma una vez por proceso).
+# Campos de Paciente por nombre, `imc_line` y un campo por antecedente
+# (sufijo de ANT_FIELDS) con el texto ya formateado por _fmt_ant.
+PACIENTE_TEMPLATE = (
+    "**Paciente**  \n"
+    "- Edad: **{edad}** años  \n"
+    "- Sexo: **{sexo}**  \n"
+    "- Tabaquismo: **{tabaquismo}**  \n"
+    "- Diabetes: **{diabetes}**  \n"
+    "- Dislipemia: **{dislipemia}**  \n"
+    "- Hipertensión arterial: **{hta}**  \n"
+    "- Antecedentes familiares: **{antecedentes_familiares}**  \n"
+    "- Peso: **{peso_kg:.2f} kg** | Altura: **{altura_m:.2f} m**{imc_line}  \n"
+    "- Alergias: **{alergias}**\n"
+    "\n"
+    "**Antecedentes por sistemas**  \n"
+    + "  \n".join(f"- {label.capitalize()}: {{{attr}}}" for attr, label in ANT_FIELDS)
+)
+
+
+# Mensajes para antecedentes vacíos, precalculados por nombre
+_EMPTY_MSG = {label: f"No presenta antecedentes {label} conocidos" for _, label in ANT_FIELDS}
+
+
+def _fmt_ant(valor: Optional[str], nombre: str) -> str:
+    """Formatea una entrada de antecedentes para el resumen.
+
+    Si `valor` es None, está vacío o solo contiene espacios retorna
+    'No presenta antecedentes <nombre> conocidos'. Si tiene texto, lo retorna
+    sin espacios al inicio/fin.
+    """
+    s = valor.strip() if valor else ""
+    if s:
+        return s
+    return _EMPTY_MSG.get(nombre) or f"No presenta antecedentes {nombre} conocidos"
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 """
 App: Historia clínica cardiológica (v3)
-Tecnología: Streamlit (single-file)
+Tecnología: Streamlit (modelos en hc_models.py)
 
 Instalación:
   pip install streamlit pydantic pandas
@@ -17,14 +17,29 @@ Cambios solicitados:
 """
 
 from __future__ import annotations
+import copy
 import json
 from datetime import date
-from typing import List
+from functools import partial
 
 import pandas as pd
 import streamlit as st
 import streamlit.components.v1 as components
-from pydantic import BaseModel, Field, ValidationError, conint, confloat
+from pydantic import ValidationError
+
+from hc_models import (
+    ANT_FIELDS,
+    EXAM_LIST_ADAPTER,
+    PACIENTE_TEMPLATE,
+    EvaluacionIndicaciones,
+    ExamenFisico,
+    HistoriaClinica,
+    Paciente,
+    _fmt_ant,
+    build_medicacion,
+    historia_as_json,
+    normalize_exams,
+)
 
 # ---------------- Configuración de página ----------------
 st.set_page_config(
@@ -36,114 +51,52 @@ st.title("Historia clínica cardiológica")
 st.caption("Formulario estructurado para registro clínico.")
 
 # ---------------- Modelos de datos ----------------
-class Paciente(BaseModel):
-    # use plain types in annotations and enforce constraints via Field to avoid
-    # call expressions in type position (static checkers)
-    edad: int = Field(..., ge=1, le=110)
-    sexo: str = Field(..., pattern=r"^(M|F)$")
-    tabaquismo: str = Field(..., pattern=r"^(Si|No|Ex\s*tabaquista|Extabaquista)$")
-    diabetes: str = Field(..., pattern=r"^(Si|No)$")
-    dislipemia: str = Field(..., pattern=r"^(Si|No)$")
-    hta: str = Field(..., pattern=r"^(Si|No)$")
-    antecedentes_familiares: str = Field(..., pattern=r"^(Si|No)$")
-    peso_kg: float = Field(..., ge=1, le=500)
-    altura_m: float = Field(..., ge=0.4, le=2.5)
-    alergias: str = Field(..., pattern=r"^(Si|No)$")
-    ant_neurologicos: str = Field(default="")
-    ant_cardiovasculares: str = Field(default="")
-    ant_respiratorios: str = Field(default="")
-    ant_gastrointestinales: str = Field(default="")
-    ant_nefrourologicos: str = Field(default="")
-    ant_traumatologicos: str = Field(default="")
-    ant_otros: str = Field(default="")
-    ant_gineco_obstetricos: str = Field(default="")
-
-class Medicacion(BaseModel):
-    nombre: str
-    dosis: float = Field(..., gt=0)
-    unidad: str = Field(..., pattern=r"^(mg|gr|ng|mcg)$")
-    frecuencia: str
-
-class ExamenFisico(BaseModel):
-    neurologico: str = Field(default="")
-    cardiovascular: str = Field(default="")
-    respiratorio: str = Field(default="")
-    gastrointestinal: str = Field(default="")
-    genitourinario: str = Field(default="")
-    piel_partes_blandas: str = Field(default="")
-    tas: int = Field(..., ge=1, le=300)
-    tad: int = Field(..., ge=1, le=200)
-
-class ExamenComplementario(BaseModel):
-    fecha: str  # ISO (YYYY-MM-DD)
-    descripcion: str
-
-class EvaluacionIndicaciones(BaseModel):
-    texto: str = ""
-    estado_clinico: str = Field(default="")
-
-class HistoriaClinica(BaseModel):
-    paciente: Paciente
-    medicacion: List[Medicacion]
-    examen_fisico: ExamenFisico
-    examenes_complementarios: List[ExamenComplementario]
-    evaluacion_indicaciones: EvaluacionIndicaciones
-
-
-def historia_as_json(hc: HistoriaClinica) -> str:
-    """Return the HistoriaClinica as a JSON string using python's json.dumps.
-
-    Uses hc.model_dump() to produce a plain dict and then encodes it with
-    ensure_ascii=False so non-ASCII characters are preserved.
-    """
-    # Compute BMI from paciente fields if available and include it in the output
-    hc_dict = hc.model_dump()
-    try:
-        p = hc_dict.get("paciente", {})
-        peso = p.get("peso_kg")
-        altura = p.get("altura_m")
-        if peso is not None and altura:
-            # protect against division by zero
-            imc = None
-            try:
-                imc = round(float(peso) / (float(altura) ** 2), 2)
-            except Exception:
-                imc = None
-            p["imc"] = imc
-        hc_dict["paciente"] = p
-    except Exception:
-        # if anything goes wrong, fall back to original dump
-        return json.dumps(hc.model_dump(), indent=2, ensure_ascii=False)
-
-    return json.dumps(hc_dict, indent=2, ensure_ascii=False)
-
-
-def _fmt_ant(valor: str, nombre: str) -> str:
-    """Formatea una entrada de antecedentes para el resumen.
-
-    Si `valor` está vacío o solo contiene espacios retorna
-    'No presenta antecedentes <nombre> conocidos'. Si tiene texto, lo retorna tal cual.
-    """
-    if valor is None:
-        return f"No presenta antecedentes {nombre} conocidos"
-    s = str(valor).strip()
-    if not s:
-        return f"No presenta antecedentes {nombre} conocidos"
-    return s
+# Definidos en hc_models.py (sin dependencias de Streamlit).
+
+# ---------------- Portapapeles ----------------
+def build_clipboard_html(text: str) -> str:
+    """Script HTML/JS que copia `text` al portapapeles (con fallback a execCommand)."""
+    return f"""<script>
+(async function(){{
+  const text = {json.dumps(text)};
+  try{{
+    if(navigator && navigator.clipboard && navigator.clipboard.writeText){{
+      await navigator.clipboard.writeText(text);
+      alert('Informe copiado al portapapeles');
+      return;
+    }}
+  }}catch(e){{}}
+  // fallback: create a textarea, select and execCommand('copy')
+  try{{
+    var ta = document.createElement('textarea');
+    ta.value = text;
+    document.body.appendChild(ta);
+    ta.select();
+    document.execCommand('copy');
+    ta.remove();
+    alert('Informe copiado al portapapeles (fallback)');
+    return;
+  }}catch(e){{
+    alert('No fue posible copiar al portapapeles desde este entorno.');
+  }}
+}})();
+</script>"""
 
 # ---------------- Estado inicial ----------------
+# Tipos nullable explícitos: las celdas vacías quedan como pd.NA y se
+# completan con un único fillna por columna al generar el informe.
 if "meds_df" not in st.session_state:
     st.session_state.meds_df = pd.DataFrame({
-        "nombre": [""],
-        "dosis": [0.0],
-        "unidad": ["mg"],
-        "frecuencia": [""]
+        "nombre": pd.array([""], dtype="string"),
+        "dosis": pd.array([0.0], dtype="Float64"),
+        "unidad": pd.array(["mg"], dtype="string"),
+        "frecuencia": pd.array([""], dtype="string"),
     })
 
 if "exams_df" not in st.session_state:
     st.session_state.exams_df = pd.DataFrame({
         "fecha": [date.today()],
-        "descripcion": [""]
+        "descripcion": pd.array([""], dtype="string"),
     })
 
 # ---------------- Sección: Datos del paciente ----------------
@@ -203,8 +156,11 @@ st.divider()
 st.header("Medicación habitual")
 st.caption("Complete nombre, dosis, unidad y frecuencia. Use +/− para agregar o quitar filas.")
 
-st.session_state.meds_df = st.data_editor(
+# El DataFrame de session_state es solo el valor inicial: con `key` Streamlit
+# conserva las ediciones y las devuelve aplicadas, sin reasignar el estado.
+meds_editados = st.data_editor(
     st.session_state.meds_df,
+    key="meds_editor",
     num_rows="dynamic",
     column_config={
         "nombre": st.column_config.TextColumn("Nombre"),
@@ -239,8 +195,9 @@ st.header("Exámenes complementarios")
 st.caption("Seleccione fecha y describa el resultado.")
 
 # Editor de tabla con fecha tipo texto ISO para facilitar exportación JSON
-st.session_state.exams_df = st.data_editor(
+exams_editados = st.data_editor(
     st.session_state.exams_df,
+    key="exams_editor",
     num_rows="dynamic",
     column_config={
         "fecha": st.column_config.DateColumn("Fecha"),
@@ -262,254 +219,248 @@ eval_texto = st.text_area(
 
 st.divider()
 
+# ---------------- Datos del formulario ----------------
+# Valores crudos de los widgets. `form_state` también identifica el formulario
+# para descartar una vista previa cuando cambia algún dato.
+paciente_data = {
+    "edad": edad,
+    "sexo": sexo,
+    "tabaquismo": tabaquismo,
+    "diabetes": diabetes,
+    "dislipemia": dislipemia,
+    "hta": hta,
+    "antecedentes_familiares": antecedentes_familiares,
+    "peso_kg": peso_kg,
+    "altura_m": altura_m,
+    "alergias": alergias,
+    "ant_neurologicos": ant_neurologicos,
+    "ant_cardiovasculares": ant_cardiovasculares,
+    "ant_respiratorios": ant_respiratorios,
+    "ant_gastrointestinales": ant_gastrointestinales,
+    "ant_nefrourologicos": ant_nefrourologicos,
+    "ant_traumatologicos": ant_traumatologicos,
+    "ant_otros": ant_otros,
+    "ant_gineco_obstetricos": ant_gineco_obstetricos,
+}
+examen_fisico_data = {
+    "neurologico": neurologico,
+    "cardiovascular": cardio,
+    "respiratorio": respiratorio,
+    "gastrointestinal": gastro,
+    "genitourinario": genitourinario,
+    "piel_partes_blandas": piel,
+    "tas": tas,
+    "tad": tad,
+}
+evaluacion_data = {"texto": eval_texto, "estado_clinico": estado_clinico}
+form_state = {
+    "paciente": paciente_data,
+    "examen_fisico": examen_fisico_data,
+    "evaluacion": evaluacion_data,
+    # cambios de los editores de tabla (filas editadas/agregadas/eliminadas)
+    "medicacion": st.session_state.get("meds_editor"),
+    "examenes": st.session_state.get("exams_editor"),
+}
+
+
+def _build_preview() -> dict:
+    """Valida el formulario y arma la vista previa del informe.
+
+    Retorna la historia validada, los bloques markdown del resumen y el texto
+    plano para el portapapeles. Lanza ValidationError si hay datos inválidos.
+    """
+    # Paciente
+    datos_paciente = Paciente.model_validate(paciente_data)
+
+    # Medicación (filtrar filas vacías)
+    meds = build_medicacion(meds_editados)
+
+    # Examen físico
+    examen_fisico = ExamenFisico.model_validate(examen_fisico_data)
+
+    # Exámenes complementarios (normalizar fecha a ISO string)
+    normalized_exams = EXAM_LIST_ADAPTER.validate_python(normalize_exams(exams_editados))
+
+    # Evaluación
+    evaluacion = EvaluacionIndicaciones.model_validate(evaluacion_data)
+
+    # Historia completa
+    hc = HistoriaClinica.model_validate({
+        "paciente": datos_paciente,
+        "medicacion": meds,
+        "examen_fisico": examen_fisico,
+        "examenes_complementarios": normalized_exams,
+        "evaluacion_indicaciones": evaluacion,
+    })
+
+    # Paciente
+    p = hc.paciente
+    imc_line = f" | IMC: {p.imc:.2f}" if p.imc is not None else ""
+
+    # Antecedentes formateados una sola vez; se reutilizan en el texto plano
+    ant_fmt = {attr: _fmt_ant(getattr(p, f"ant_{attr}"), label) for attr, label in ANT_FIELDS}
+
+    paciente_md = PACIENTE_TEMPLATE.format_map({**dict(p), "imc_line": imc_line, **ant_fmt})
+
+    # Medicación, examen físico, exámenes complementarios y evaluación:
+    # se arma un único bloque markdown (un solo elemento en el navegador).
+    # Cada sección es un párrafo y sus renglones se separan con salto duro.
+    ef = hc.examen_fisico
+    parts: list[str] = []
+
+    med_lines = ["**Medicación habitual**"]
+    if hc.medicacion:
+        for m in hc.medicacion:
+            med_lines.append(f"• {m.nombre}: {m.dosis} {m.unidad}, {m.frecuencia}")
+    else:
+        med_lines.append("• Sin medicación informada")
+    parts.append("  \n".join(med_lines))
+
+    parts.append("  \n".join([
+        "**Examen físico**",
+        f"Neurológico: {ef.neurologico or '—'}",
+        f"Cardiovascular: {ef.cardiovascular or '—'}",
+        f"Respiratorio: {ef.respiratorio or '—'}",
+        f"Gastrointestinal: {ef.gastrointestinal or '—'}",
+        f"Genitourinario: {ef.genitourinario or '—'}",
+        f"Piel y partes blandas: {ef.piel_partes_blandas or '—'}",
+        f"Tensión arterial: TAS {ef.tas} / TAD {ef.tad} mmHg",
+    ]))
+
+    exam_lines = ["**Exámenes complementarios**"]
+    if hc.examenes_complementarios:
+        for e in hc.examenes_complementarios:
+            exam_lines.append(f"• Fecha: {e.fecha or '—'} — {e.descripcion}")
+    else:
+        exam_lines.append("• No registrados")
+    parts.append("  \n".join(exam_lines))
+
+    parts.append("**Evaluación e Indicaciones**")
+    parts.append(hc.evaluacion_indicaciones.texto or "—")
+    resto_md = "\n\n".join(parts)
+
+    # Construir texto plano del informe para copiar al portapapeles
+    ant_text = "\n".join(f"{label.capitalize()}: {ant_fmt[attr]}" for attr, label in ANT_FIELDS)
+    med_text = "\n".join(
+        f"- {m.nombre}: {m.dosis} {m.unidad}, {m.frecuencia}" for m in hc.medicacion
+    ) or "- Sin medicación informada"
+    # Examen físico resumen corto: incluir solo secciones completadas
+    exam_sections = (
+        ("Neurológico", ef.neurologico),
+        ("Cardiovascular", ef.cardiovascular),
+        ("Respiratorio", ef.respiratorio),
+        ("Gastrointestinal", ef.gastrointestinal),
+        ("Genitourinario", ef.genitourinario),
+        ("Piel y partes blandas", ef.piel_partes_blandas),
+    )
+    ef_text = "".join(f"{label}: {val}\n" for label, val in exam_sections if val and val.strip())
+    # Los literales adyacentes se compilan como un único f-string.
+    report_text = (
+        "Estado clínico:\n"
+        f"{hc.evaluacion_indicaciones.estado_clinico or '-'}\n"
+        "\n"
+        "Paciente:\n"
+        f"Edad: {p.edad} años\n"
+        f"Sexo: {p.sexo}\n"
+        f"Tabaquismo: {p.tabaquismo}\n"
+        f"Diabetes: {p.diabetes}\n"
+        f"Dislipemia: {p.dislipemia}\n"
+        f"Hipertensión arterial: {p.hta}\n"
+        f"Antecedentes familiares: {p.antecedentes_familiares}\n"
+        f"Peso: {p.peso_kg:.2f} kg | Altura: {p.altura_m:.2f} m\n"
+        f"Alergias: {p.alergias}\n"
+        "\n"
+        "Antecedentes por sistemas:\n"
+        f"{ant_text}\n"
+        "\n"
+        "Medicación habitual:\n"
+        f"{med_text}\n"
+        "\n"
+        "Examen físico:\n"
+        f"{ef_text}"
+        # Siempre incluir la tensión arterial (es numérica y obligatoria en el modelo)
+        f"Tensión arterial: TAS {ef.tas} / TAD {ef.tad} mmHg"
+    )
+
+    return {
+        "hc": hc,
+        "markdown": [
+            "**Estado clínico**",
+            hc.evaluacion_indicaciones.estado_clinico or "—",
+            paciente_md,
+            resto_md,
+        ],
+        "report_text": report_text,
+    }
+
+
 # ---------------- Botón de validación y vista previa ----------------
-if st.button("Generar vista previa del informe"):
-    try:
-        # Paciente
-        datos_paciente = Paciente(
-            edad=edad,
-            sexo=sexo,
-            tabaquismo=tabaquismo,
-            diabetes=diabetes,
-            dislipemia=dislipemia,
-            hta=hta,
-            antecedentes_familiares=antecedentes_familiares,
-            peso_kg=peso_kg,
-            altura_m=altura_m,
-            alergias=alergias,
-            ant_neurologicos=ant_neurologicos,
-            ant_cardiovasculares=ant_cardiovasculares,
-            ant_respiratorios=ant_respiratorios,
-            ant_gastrointestinales=ant_gastrointestinales,
-            ant_nefrourologicos=ant_nefrourologicos,
-            ant_traumatologicos=ant_traumatologicos,
-            ant_otros=ant_otros,
-            ant_gineco_obstetricos=ant_gineco_obstetricos,
-        )
-        
-        # Medicación (filtrar filas vacías)
-        meds_rows = st.session_state.meds_df.replace({pd.NA: None}).to_dict(orient="records")
-        meds = [Medicacion(**r) for r in meds_rows if r.get("nombre")]
-
-        # Examen físico
-        examen_fisico = ExamenFisico(
-            neurologico=neurologico,
-            cardiovascular=cardio,
-            respiratorio=respiratorio,
-            gastrointestinal=gastro,
-            genitourinario=genitourinario,
-            piel_partes_blandas=piel,
-            tas=tas,
-            tad=tad,
-        )
-
-        # Exámenes complementarios (normalizar fecha a ISO string)
-        exams_rows = st.session_state.exams_df.replace({pd.NA: None}).to_dict(orient="records")
-        normalized_exams = []
-        for r in exams_rows:
-            f = r.get("fecha")
-            if isinstance(f, str):
-                fecha_iso = f
-            elif f is None:
-                fecha_iso = ""
-            else:
-                # Date object
-                fecha_iso = f.isoformat()
-            if r.get("descripcion") or fecha_iso:
-                normalized_exams.append(ExamenComplementario(fecha=fecha_iso, descripcion=r.get("descripcion", "")))
-
-        # Evaluación
-        evaluacion = EvaluacionIndicaciones(texto=eval_texto, estado_clinico=estado_clinico)
-
-        # Historia completa
-        hc = HistoriaClinica(
-            paciente=datos_paciente,
-            medicacion=meds,
-            examen_fisico=examen_fisico,
-            examenes_complementarios=normalized_exams,
-            evaluacion_indicaciones=evaluacion,
-        )
-
-        st.success("Datos validados correctamente.")
-        st.subheader("Resumen estructurado")
-
-        # Mostrar Estado clínico primero
-        st.markdown("**Estado clínico**")
-        st.write(hc.evaluacion_indicaciones.estado_clinico or "—")
-
-        # Paciente
-        p = hc.paciente
-        # calcular IMC para mostrar en pantalla (protección contra división por cero)
-        imc_display = None
+@st.fragment
+def _render_report():
+    """Validación y vista previa del informe.
+
+    Se ejecuta como fragmento: los botones internos solo re-ejecutan este
+    bloque, no todo el formulario.
+    """
+    # "Generar" valida y guarda una instantánea de la vista previa junto con el
+    # estado del formulario. "Copiar" y "Descargar" re-ejecutan solo este
+    # fragmento y muestran la instantánea sin volver a validar. Si el formulario
+    # cambió (re-ejecución completa), la instantánea se descarta.
+    if st.button("Generar vista previa del informe"):
+        st.session_state.pop("preview", None)
         try:
-            if p.altura_m and p.peso_kg:
-                imc_display = round(float(p.peso_kg) / (float(p.altura_m) ** 2), 2)
-        except Exception:
-            imc_display = None
-        imc_line = f" | IMC: {imc_display:.2f}" if imc_display is not None else ""
-
-        st.markdown(
-            f"""
-            **Paciente**  
-            - Edad: **{p.edad}** años  
-            - Sexo: **{p.sexo}**  
-            - Tabaquismo: **{p.tabaquismo}**  
-            - Diabetes: **{p.diabetes}**  
-            - Dislipemia: **{p.dislipemia}**  
-            - Hipertensión arterial: **{p.hta}**  
-            - Antecedentes familiares: **{p.antecedentes_familiares}**  
-            - Peso: **{p.peso_kg:.2f} kg** | Altura: **{p.altura_m:.2f} m**{imc_line}  
-            - Alergias: **{p.alergias}**
-
-            **Antecedentes por sistemas**  
-            - Neurológicos: {_fmt_ant(p.ant_neurologicos, 'neurológicos')}  
-            - Cardiovasculares: {_fmt_ant(p.ant_cardiovasculares, 'cardiovasculares')}  
-            - Respiratorios: {_fmt_ant(p.ant_respiratorios, 'respiratorios')}  
-            - Gastrointestinales: {_fmt_ant(p.ant_gastrointestinales, 'gastrointestinales')}  
-            - Nefro-urológicos: {_fmt_ant(p.ant_nefrourologicos, 'nefro-urológicos')}  
-            - Traumatológicos: {_fmt_ant(p.ant_traumatologicos, 'traumatológicos')}  
-            - Gineco-obstétricos: {_fmt_ant(p.ant_gineco_obstetricos, 'gineco-obstétricos')}  
-            - Otros: {_fmt_ant(p.ant_otros, 'otros')}
-            """
-        )
-
-        # Medicación
-        st.markdown("**Medicación habitual**")
-        if hc.medicacion:
-            for m in hc.medicacion:
-                st.write(f"• {m.nombre}: {m.dosis} {m.unidad}, {m.frecuencia}")
-        else:
-            st.write("• Sin medicación informada")
-
-        # Examen físico
-        ef = hc.examen_fisico
-        st.markdown("**Examen físico**")
-        st.write(f"Neurológico: {ef.neurologico or '—'}")
-        st.write(f"Cardiovascular: {ef.cardiovascular or '—'}")
-        st.write(f"Respiratorio: {ef.respiratorio or '—'}")
-        st.write(f"Gastrointestinal: {ef.gastrointestinal or '—'}")
-        st.write(f"Genitourinario: {ef.genitourinario or '—'}")
-        st.write(f"Piel y partes blandas: {ef.piel_partes_blandas or '—'}")
-        st.write(f"Tensión arterial: TAS {ef.tas} / TAD {ef.tad} mmHg")
-
-        # Exámenes complementarios
-        st.markdown("**Exámenes complementarios**")
-        if hc.examenes_complementarios:
-            for e in hc.examenes_complementarios:
-                st.write(f"• Fecha: {e.fecha or '—'} — {e.descripcion}")
-        else:
-            st.write("• No registrados")
-
-        # Evaluación
-        st.markdown("**Evaluación e Indicaciones**")
-        st.write(hc.evaluacion_indicaciones.texto or "—")
-
-        # Construir texto plano del informe para copiar al portapapeles
-        lines = []
-        lines.append("Estado clínico:")
-        lines.append(hc.evaluacion_indicaciones.estado_clinico or "-")
-        lines.append("")
-        lines.append("Paciente:")
-        lines.append(f"Edad: {p.edad} años")
-        lines.append(f"Sexo: {p.sexo}")
-        lines.append(f"Tabaquismo: {p.tabaquismo}")
-        lines.append(f"Diabetes: {p.diabetes}")
-        lines.append(f"Dislipemia: {p.dislipemia}")
-        lines.append(f"Hipertensión arterial: {p.hta}")
-        lines.append(f"Antecedentes familiares: {p.antecedentes_familiares}")
-        lines.append(f"Peso: {p.peso_kg:.2f} kg | Altura: {p.altura_m:.2f} m")
-        lines.append(f"Alergias: {p.alergias}")
-        lines.append("")
-        lines.append("Antecedentes por sistemas:")
-        lines.append(f"Neurológicos: {_fmt_ant(p.ant_neurologicos, 'neurológicos')}")
-        lines.append(f"Cardiovasculares: {_fmt_ant(p.ant_cardiovasculares, 'cardiovasculares')}")
-        lines.append(f"Respiratorios: {_fmt_ant(p.ant_respiratorios, 'respiratorios')}")
-        lines.append(f"Gastrointestinales: {_fmt_ant(p.ant_gastrointestinales, 'gastrointestinales')}")
-        lines.append(f"Nefro-urológicos: {_fmt_ant(p.ant_nefrourologicos, 'nefro-urológicos')}")
-        lines.append(f"Traumatológicos: {_fmt_ant(p.ant_traumatologicos, 'traumatológicos')}")
-        lines.append(f"Gineco-obstétricos: {_fmt_ant(p.ant_gineco_obstetricos, 'gineco-obstétricos')}")
-        lines.append(f"Otros: {_fmt_ant(p.ant_otros, 'otros')}")
-        lines.append("")
-        # Medicación
-        lines.append("Medicación habitual:")
-        if hc.medicacion:
-            for m in hc.medicacion:
-                lines.append(f"- {m.nombre}: {m.dosis} {m.unidad}, {m.frecuencia}")
-        else:
-            lines.append("- Sin medicación informada")
-        # Examen físico resumen corto: incluir solo secciones completadas
-        lines.append("")
-        lines.append("Examen físico:")
-        if ef.neurologico and str(ef.neurologico).strip():
-            lines.append(f"Neurológico: {ef.neurologico}")
-        if ef.cardiovascular and str(ef.cardiovascular).strip():
-            lines.append(f"Cardiovascular: {ef.cardiovascular}")
-        if ef.respiratorio and str(ef.respiratorio).strip():
-            lines.append(f"Respiratorio: {ef.respiratorio}")
-        if ef.gastrointestinal and str(ef.gastrointestinal).strip():
-            lines.append(f"Gastrointestinal: {ef.gastrointestinal}")
-        if ef.genitourinario and str(ef.genitourinario).strip():
-            lines.append(f"Genitourinario: {ef.genitourinario}")
-        if ef.piel_partes_blandas and str(ef.piel_partes_blandas).strip():
-            lines.append(f"Piel y partes blandas: {ef.piel_partes_blandas}")
-        # Siempre incluir la tensión arterial (es numérica y obligatoria en el modelo)
-        lines.append(f"Tensión arterial: TAS {ef.tas} / TAD {ef.tad} mmHg")
-
-        report_text = "\n".join(lines)
-
-        # Botón para copiar al portapapeles (usa componente HTML/JS con fallback)
-        if st.button("Copiar informe al portapapeles"):
-            html = (
-                "<script>" +
-                "(async function(){\n" +
-                "  const text = " + json.dumps(report_text) + ";\n" +
-                "  try{\n" +
-                "    if(navigator && navigator.clipboard && navigator.clipboard.writeText){\n" +
-                "      await navigator.clipboard.writeText(text);\n" +
-                "      alert('Informe copiado al portapapeles');\n" +
-                "      return;\n" +
-                "    }\n" +
-                "  }catch(e){}\n" +
-                "  // fallback: create a textarea, select and execCommand('copy')\n" +
-                "  try{\n" +
-                "    var ta = document.createElement('textarea');\n" +
-                "    ta.value = text;\n" +
-                "    document.body.appendChild(ta);\n" +
-                "    ta.select();\n" +
-                "    document.execCommand('copy');\n" +
-                "    ta.remove();\n" +
-                "    alert('Informe copiado al portapapeles (fallback)');\n" +
-                "    return;\n" +
-                "  }catch(e){\n" +
-                "    alert('No fue posible copiar al portapapeles desde este entorno.');\n" +
-                "  }\n" +
-                "})();" +
-                "</script>"
-            )
-            components.html(html, height=10)
-
-        # Exportar JSON
-        st.download_button(
-            label="Descargar JSON de la historia",
-            data=historia_as_json(hc),
-            file_name="historia_clinica_cardiologica.json",
-            mime="application/json",
-        )
-
-    except ValidationError as e:
-        st.error("Errores de validación:")
-        for err in e.errors():
-            st.write(f"- {err['loc']}: {err['msg']}")
+            preview = _build_preview()
+        except ValidationError as e:
+            st.error("Errores de validación:")
+            for err in e.errors():
+                st.write(f"- {err['loc']}: {err['msg']}")
+            return
+        preview["form"] = copy.deepcopy(form_state)
+        st.session_state.preview = preview
+
+    preview = st.session_state.get("preview")
+    if preview is None:
+        return
+    if preview["form"] != form_state:
+        del st.session_state.preview
+        return
+
+    st.success("Datos validados correctamente.")
+    st.subheader("Resumen estructurado")
+    for bloque in preview["markdown"]:
+        st.markdown(bloque)
+
+    # Botón para copiar al portapapeles (usa componente HTML/JS con fallback)
+    if st.button("Copiar informe al portapapeles"):
+        components.html(build_clipboard_html(preview["report_text"]), height=10)
+
+    # Exportar JSON: generación diferida, solo cuando se pulsa el botón
+    # (no en cada re-ejecución del fragmento).
+    st.download_button(
+        label="Descargar JSON de la historia",
+        data=partial(historia_as_json, preview["hc"]),
+        file_name="historia_clinica_cardiologica.json",
+        mime="application/json",
+    )
+
+
+_render_report()
 
 st.info("Nota: Esta versión no persiste datos ni exporta PDF. Se puede agregar si lo necesitás.")
 
-# Botón para abrir calculadora de riesgo cardiovascular (abre en nueva pestaña)
-st.markdown(
-        """
-        <div style="display:flex; gap:8px">
-            <a href="https://www.paho.org/cardioapp/web/#/cvrisk" target="_blank"><button>Calcular riesgo cardiovascular</button></a>
-            <a href="https://www.paho.org/cardioapp/web/#/renalrisk" target="_blank"><button>Calcular filtrado glomerular</button></a>
-        </div>
-        """,
-        unsafe_allow_html=True,
-)
+# Botones para abrir calculadoras de riesgo cardiovascular y filtrado glomerular
+# (abren en nueva pestaña). HTML constante, emitido desde un fragmento.
+CVRISK_HTML = """
+<div style="display:flex; gap:8px">
+    <a href="https://www.paho.org/cardioapp/web/#/cvrisk" target="_blank"><button>Calcular riesgo cardiovascular</button></a>
+    <a href="https://www.paho.org/cardioapp/web/#/renalrisk" target="_blank"><button>Calcular filtrado glomerular</button></a>
+</div>
+"""
+
+
+@st.fragment
+def _render_footer():
+    st.markdown(CVRISK_HTML, unsafe_allow_html=True)
+
+
+_render_footer()
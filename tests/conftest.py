@@ -0,0 +1,14 @@
+import importlib.util
+import sys
+from pathlib import Path
+
+# Load hc_models once per session from the project root and register it in
+# sys.modules, so every test module's `from hc_models import ...` reuses the
+# same module object regardless of the directory pytest is launched from.
+HC_MODELS_PATH = Path(__file__).resolve().parent.parent / "hc_models.py"
+
+if "hc_models" not in sys.modules:
+    _spec = importlib.util.spec_from_file_location("hc_models", HC_MODELS_PATH)
+    _module = importlib.util.module_from_spec(_spec)
+    sys.modules["hc_models"] = _module
+    _spec.loader.exec_module(_module)
@@ -1,16 +1,14 @@
-import runpy
-import runpy
 from datetime import date
 import pytest
 from pydantic import ValidationError
 
-# Load the module and extract model classes
-module = runpy.run_path(r"c:\Users\Tavi\Desktop\HC3\historia_clinica_cardiologica_app_v_3.py")
-Paciente = module["Paciente"]
-Medicacion = module["Medicacion"]
-ExamenFisico = module["ExamenFisico"]
-ExamenComplementario = module["ExamenComplementario"]
-HistoriaClinica = module["HistoriaClinica"]
+from hc_models import (
+    ExamenComplementario,
+    ExamenFisico,
+    HistoriaClinica,
+    Medicacion,
+    Paciente,
+)
 
 
 def make_valid_payload():
@@ -47,6 +45,7 @@ def test_valid_historia_creates():
     hc = make_valid_payload()
     assert hc.paciente.edad == 45
     assert len(hc.medicacion) == 1
+    assert hc.paciente.imc == round(75.5 / 1.72 ** 2, 2)
 
 
 def test_invalid_peso_raises():
@@ -64,3 +63,12 @@ def test_invalid_peso_raises():
     )
     with pytest.raises(ValidationError):
         Paciente(**paciente_data)
+
+
+def test_imc_follows_peso_and_altura():
+    p = make_valid_payload().paciente
+    assert p.imc == round(75.5 / 1.72 ** 2, 2)
+    p.peso_kg = 100.0
+    assert p.imc == p.model_dump()['imc'] == round(100.0 / 1.72 ** 2, 2)
+    copia = p.model_copy(update={'altura_m': 1.8})
+    assert copia.model_dump()['imc'] == round(100.0 / 1.8 ** 2, 2)
@@ -1,15 +1,23 @@
-import runpy
 import json
 from datetime import date
+import pandas as pd
+import pytest
 from pydantic import ValidationError
 
-m = runpy.run_path(r"c:\Users\Tavi\Desktop\HC3\historia_clinica_cardiologica_app_v_3.py")
-Paciente = m['Paciente']
-Medicacion = m['Medicacion']
-ExamenFisico = m['ExamenFisico']
-ExamenComplementario = m['ExamenComplementario']
-HistoriaClinica = m['HistoriaClinica']
-historia_as_json = m['historia_as_json']
+from hc_models import (
+    ANT_FIELDS,
+    EXAM_LIST_ADAPTER,
+    PACIENTE_TEMPLATE,
+    ExamenComplementario,
+    ExamenFisico,
+    HistoriaClinica,
+    Medicacion,
+    Paciente,
+    _fmt_ant,
+    build_medicacion,
+    historia_as_json,
+    normalize_exams,
+)
 
 
 def test_json_export_and_structure():
@@ -45,40 +53,126 @@ def test_json_export_and_structure():
     assert 'paciente' in got
     assert 'medicacion' in got
     assert 'examenes_complementarios' in got
+    assert json.loads(got)['paciente']['imc'] == round(65.0 / 1.6 ** 2, 2)
+
+
+def test_json_export_keeps_non_ascii():
+    p = Paciente(
+        edad=52,
+        sexo='M',
+        tabaquismo='Ex tabaquista',
+        diabetes='Si',
+        dislipemia='No',
+        hta='Si',
+        antecedentes_familiares='No',
+        peso_kg=80.0,
+        altura_m=1.75,
+        alergias='No',
+        ant_cardiovasculares='Angioplastia coronaria, año 2019',
+    )
+    hc = HistoriaClinica(
+        paciente=p,
+        medicacion=[],
+        examen_fisico=ExamenFisico(tas=130, tad=85, cardiovascular='Soplo sistólico 2/6'),
+        examenes_complementarios=[],
+        evaluacion_indicaciones={'texto': 'Control en 3 meses', 'estado_clinico': 'Estable, sin disnea ni ángor'},
+    )
+
+    got = historia_as_json(hc)
+    # non-ASCII characters are written as-is, not as \u escapes
+    assert 'año 2019' in got
+    assert 'sistólico' in got
+    assert 'ángor' in got
+    assert '\\u' not in got
+    assert json.loads(got) == json.loads(json.dumps(hc.model_dump()))
+
+
+def _meds_df(nombre, dosis, unidad, frecuencia):
+    # same nullable dtypes as the app's data_editor table
+    return pd.DataFrame({
+        'nombre': pd.array(nombre, dtype='string'),
+        'dosis': pd.array(dosis, dtype='Float64'),
+        'unidad': pd.array(unidad, dtype='string'),
+        'frecuencia': pd.array(frecuencia, dtype='string'),
+    })
 
 
 def test_medicacion_filtering():
-    # simulate the data_editor -> to_dict records with an empty row
-    rows = [
-        {'nombre': 'Aspirina', 'dosis': 100.0, 'unidad': 'mg', 'frecuencia': 'Diaria'},
-        {'nombre': '', 'dosis': 0.0, 'unidad': 'mg', 'frecuencia': ''},
-    ]
-    meds = [Medicacion(**r) for r in rows if r.get('nombre')]
+    # an empty and a fully missing row are skipped
+    df = _meds_df(
+        ['Aspirina', '', None],
+        [100.0, 0.0, None],
+        ['mg', 'mg', None],
+        ['Diaria', '', None],
+    )
+    meds = build_medicacion(df)
     assert len(meds) == 1
     assert meds[0].nombre == 'Aspirina'
+    assert meds[0].dosis == 100.0
+
+
+def test_medicacion_missing_unidad_raises():
+    df = _meds_df(['Enalapril'], [10.0], [None], ['c/12 h'])
+    with pytest.raises(ValidationError) as exc:
+        build_medicacion(df)
+    assert exc.value.errors()[0]['loc'] == (0, 'unidad')
+
+
+def test_medicacion_blank_dosis_raises():
+    # a blank dosis is filled with 0.0 and rejected by gt=0
+    df = _meds_df(['Atorvastatina'], [None], ['mg'], ['Diaria'])
+    with pytest.raises(ValidationError) as exc:
+        build_medicacion(df)
+    assert exc.value.errors()[0]['loc'] == (0, 'dosis')
+    assert exc.value.errors()[0]['type'] == 'greater_than'
 
 
 def test_date_normalization_from_mixed_types():
-    # The app normalizes dates from strings and date objects.
-    # emulate mixed inputs
-    raw = [
-        {'fecha': date.today(), 'descripcion': 'A'},
+    # The data_editor table mixes date objects, ISO strings and empty cells
+    df = pd.DataFrame({
+        'fecha': [date.today(), date.today().isoformat(), None, pd.NaT, 'no es fecha'],
+        'descripcion': pd.array(['A', 'B', '', 'ECG sin fecha', 'C'], dtype='string'),
+    })
+
+    normalized = normalize_exams(df)
+
+    assert normalized == [
+        {'fecha': date.today().isoformat(), 'descripcion': 'A'},
         {'fecha': date.today().isoformat(), 'descripcion': 'B'},
-        {'fecha': None, 'descripcion': ''},
+        # missing fecha with a description is kept with an empty date
+        {'fecha': '', 'descripcion': 'ECG sin fecha'},
+        # unparseable strings are coerced to an empty date
+        {'fecha': '', 'descripcion': 'C'},
     ]
+    assert len(EXAM_LIST_ADAPTER.validate_python(normalized)) == 4
 
-    normalized = []
-    for r in raw:
-        f = r.get('fecha')
-        if isinstance(f, str):
-            fecha_iso = f
-        elif f is None:
-            fecha_iso = ''
-        else:
-            fecha_iso = f.isoformat()
-        if r.get('descripcion') or fecha_iso:
-            normalized.append({'fecha': fecha_iso, 'descripcion': r.get('descripcion', '')})
-
-    assert len(normalized) == 2
-    assert normalized[0]['fecha'] == date.today().isoformat()
-    assert normalized[1]['fecha'] == date.today().isoformat()
+
+def test_date_normalization_drops_empty_rows():
+    df = pd.DataFrame({
+        'fecha': [None, date(2024, 5, 2)],
+        'descripcion': pd.array([None, None], dtype='string'),
+    })
+    assert normalize_exams(df) == [{'fecha': '2024-05-02', 'descripcion': ''}]
+
+
+def test_fmt_ant_empty_and_text():
+    assert _fmt_ant('', 'neurológicos') == 'No presenta antecedentes neurológicos conocidos'
+    assert _fmt_ant('   ', 'otros') == 'No presenta antecedentes otros conocidos'
+    assert _fmt_ant(None, 'cardiovasculares') == 'No presenta antecedentes cardiovasculares conocidos'
+    # labels outside ANT_FIELDS still get the generic message
+    assert _fmt_ant('', 'oftalmológicos') == 'No presenta antecedentes oftalmológicos conocidos'
+    assert _fmt_ant('  ACV 2015 ', 'neurológicos') == 'ACV 2015'
+
+
+def test_paciente_template_fills_all_fields():
+    p = Paciente(
+        edad=60, sexo='F', tabaquismo='No', diabetes='Si', dislipemia='No', hta='Si',
+        antecedentes_familiares='No', peso_kg=70.0, altura_m=1.65, alergias='No',
+        ant_gineco_obstetricos='G2P2',
+    )
+    ant_fmt = {attr: _fmt_ant(getattr(p, f'ant_{attr}'), label) for attr, label in ANT_FIELDS}
+    md = PACIENTE_TEMPLATE.format_map({**dict(p), 'imc_line': ' | IMC: 25.71', **ant_fmt})
+    assert '- Edad: **60** años' in md
+    assert '- Peso: **70.00 kg** | Altura: **1.65 m** | IMC: 25.71' in md
+    assert '- Gineco-obstétricos: G2P2' in md
+    assert '- Otros: No presenta antecedentes otros conocidos' in md